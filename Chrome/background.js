@@ -1,8 +1,5 @@
-// Import shared HTML conversion script
-importScripts('html-converter.js');
-
-// Track conversations by tab title
-let conversationsByTabTitle = {};
+// Import shared HTML conversion script and the captured conversation store
+importScripts('html-converter.js', 'capture-store.js');
 
 // Track requests with timestamps
 const requestTimestamps = new Map();
@@ -74,30 +71,16 @@ chrome.webRequest.onCompleted.addListener(
           // Fallback to UUID or a generic name if 'name' is not available
           const conversationKey = jsonData.name || jsonData.uuid || 'Untitled Conversation';
           
-          // Skip if we've already processed this exact URL for this conversation key
-          if (conversationsByTabTitle[conversationKey]?.url === details.url) {
-            console.log('Skipping already processed conversation for key:', conversationKey);
-            return;
-          }
-
-          // Store the conversation data
-          conversationsByTabTitle[conversationKey] = {
-            url: details.url,
-            timestamp: new Date().toISOString(),
-            data: jsonData
-          };
-
-          // Store in chrome storage
-          chrome.storage.local.set(
-            { conversationsByTabTitle: conversationsByTabTitle }, 
-            () => {
-              if (chrome.runtime.lastError) {
-                console.error('Error storing conversations:', chrome.runtime.lastError);
-              } else {
-                console.log('Conversations stored in local storage');
-              }
+          // Store the conversation, skipping it if this version is already stored
+          try {
+            if (await saveCapture(conversationKey, details.url, jsonData)) {
+              console.log('Conversation stored for key:', conversationKey);
+            } else {
+              console.log('Skipping already stored conversation for key:', conversationKey);
             }
-          );
+          } catch (storeError) {
+            console.error('Error storing conversation:', storeError);
+          }
         } catch (jsonError) {
           console.warn('Invalid JSON response, ignoring:', jsonError);
         }
@@ -109,12 +92,12 @@ chrome.webRequest.onCompleted.addListener(
   { urls: ['<all_urls>'] }
 );
 
-// Listen for storage changes to clear in-memory cache
-chrome.storage.onChanged.addListener((changes, namespace) => {
-  if (namespace === 'local' && changes.conversationsByTabTitle && changes.conversationsByTabTitle.newValue === undefined) {
-    conversationsByTabTitle = {};
-    console.log('Cleared in-memory cache of conversations');
-  }
+// Answer the popup's requests for captured conversations
+chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
+  const response = handleCaptureMessage(message);
+  if (!response) return false;
+  response.then(sendResponse, (error) => sendResponse({ error: error.message }));
+  return true; // sendResponse is called asynchronously
 });
 
 // Helper function to validate conversation data structure
@@ -146,33 +129,18 @@ chrome.tabs.onRemoved.addListener((tabId, removeInfo) => {
   chrome.tabs.get(tabId, (tab) => {
     if (chrome.runtime.lastError) return; // Tab might already be gone
     const tabTitle = tab.title || 'Untitled Tab';
-    // Iterate through stored conversations and remove those whose names match the closed tab's title
+    // Drop the conversation whose name matches the closed tab's title from memory.
     // This assumes conversation name is often the tab title, which might not always be true,
-    // but it's a reasonable heuristic for cleanup.
-    for (const key in conversationsByTabTitle) {
-      if (key === tabTitle) { // Check if the stored conversation key matches the closed tab's title
-        delete conversationsByTabTitle[key];
-        console.log('Cleared cached conversation for closed tab (by title match):', tabTitle);
-      }
-    }
-    // Also, if the conversation was stored by its actual name, and that name was the tab title,
-    // it will be cleared. If the tab title was generic "Claude", and the conversation had a specific name,
-    // that specific conversation will remain. This is desired.
+    // but it's a reasonable heuristic for cleanup. The conversation stays in IndexedDB.
+    forgetCachedCapture(tabTitle);
+    console.log('Cleared cached conversation for closed tab (by title match):', tabTitle);
   });
 });
 
-// Periodically sync with chrome.storage to prevent memory leaks
-setInterval(() => {
-  chrome.storage.local.get('conversationsByTabTitle', (result) => {
-    const storedData = result.conversationsByTabTitle || {};
-    for (const [title, data] of Object.entries(storedData)) {
-      if (!conversationsByTabTitle[title] || 
-          new Date(data.timestamp) > new Date(conversationsByTabTitle[title].timestamp)) {
-        conversationsByTabTitle[title] = data;
-      }
-    }
-  });
-}, 5 * 60 * 1000);
+// Conversations captured by earlier versions were kept in chrome.storage
+migrateLegacyCaptures(chrome.storage.local).catch((error) => {
+  console.error('Error moving captured conversations to IndexedDB:', error);
+});
 
 // Ensure the service worker stays active
 chrome.runtime.onInstalled.addListener(() => {
@@ -1,9 +1,22 @@
+// Summaries of the captured conversations, keyed by conversation name.
+// The conversation data itself is only fetched from the background script when downloading.
 let conversationsByTabTitle = {};
 
+async function loadCapturedConversations() {
+  const summaries = await chrome.runtime.sendMessage({ type: 'listCaptures' });
+  if (summaries && summaries.error) {
+    throw new Error(summaries.error);
+  }
+  const conversations = {};
+  (summaries || []).forEach(summary => {
+    conversations[summary.key] = summary;
+  });
+  return conversations;
+}
+
 document.getElementById('viewBtn').addEventListener('click', async () => {
   try {
-    const storage = await chrome.storage.local.get('conversationsByTabTitle');
-    conversationsByTabTitle = storage.conversationsByTabTitle || {};
+    conversationsByTabTitle = await loadCapturedConversations();
     
     const statusEl = document.getElementById('status');
    
@@ -46,8 +59,7 @@ document.getElementById('viewBtn').addEventListener('click', async () => {
 document.getElementById('downloadBtn').addEventListener('click', async () => {
   try {
     // Retrieve conversations again to ensure we have the latest
-    const storage = await chrome.storage.local.get('conversationsByTabTitle');
-    conversationsByTabTitle = storage.conversationsByTabTitle || {};
+    conversationsByTabTitle = await loadCapturedConversations();
     
     // No longer filtering by 'Claude' tab title
     const availableConversations = conversationsByTabTitle;
@@ -111,7 +123,7 @@ document.getElementById('downloadBtn').addEventListener('click', async () => {
 
 document.getElementById('clearBtn').addEventListener('click', async () => {
   try {
-    await chrome.storage.local.remove('conversationsByTabTitle');
+    await chrome.runtime.sendMessage({ type: 'clearCaptures' });
     conversationsByTabTitle = {};
     
     document.getElementById('status').innerHTML = `
@@ -138,31 +150,40 @@ document.getElementById('printArtifacts').addEventListener('change', async (e) =
   await chrome.storage.local.set({ printArtifactsEnabled: e.target.checked });
 });
 
-function downloadConversation(conversationName) {
+async function downloadConversation(conversationName) {
   // The 'Claude' tab title check is removed here as conversations are now stored by their actual names.
   // If a conversation's name happens to be 'Claude', it can still be downloaded.
   
-  const conversation = conversationsByTabTitle[conversationName];
-  
-  if (conversation) {
-    const jsonString = JSON.stringify(conversation.data);
-    const printArtifacts = document.getElementById('printArtifacts').checked;
-    // The generateHtml function is imported via html-converter.js
-    const html = generateHtml(jsonString, printArtifacts);
+  try {
+    // Fetch the conversation data only now, when it is actually needed
+    const conversation = await chrome.runtime.sendMessage({ type: 'getCapture', key: conversationName });
+    if (conversation && conversation.error) {
+      throw new Error(conversation.error);
+    }
 
-    const blob = new Blob([html], {type: 'text/html'});
-    const url = URL.createObjectURL(blob);
-    
-    const a = document.createElement('a');
-    a.href = url;
-    // Use conversationName in the filename
-    a.download = `chat_conversations_${conversation.timestamp.replace(/:/g, '-')}_${encodeURIComponent(conversationName)}.html`;
-    document.body.appendChild(a);
-    a.click();
-    document.body.removeChild(a);
-    
-    URL.revokeObjectURL(url);
-    document.getElementById('status').innerHTML = '';
+    if (conversation) {
+      const jsonString = JSON.stringify(conversation.data);
+      const printArtifacts = document.getElementById('printArtifacts').checked;
+      // The generateHtml function is imported via html-converter.js
+      const html = generateHtml(jsonString, printArtifacts);
+
+      const blob = new Blob([html], {type: 'text/html'});
+      const url = URL.createObjectURL(blob);
+      
+      const a = document.createElement('a');
+      a.href = url;
+      // Use conversationName in the filename
+      a.download = `chat_conversations_${conversation.timestamp.replace(/:/g, '-')}_${encodeURIComponent(conversationName)}.html`;
+      document.body.appendChild(a);
+      a.click();
+      document.body.removeChild(a);
+      
+      URL.revokeObjectURL(url);
+      document.getElementById('status').innerHTML = '';
+    }
+  } catch (error) {
+    console.error('Error downloading conversation:', error);
+    document.getElementById('status').textContent = `Error: ${error.message}`;
   }
 }
 
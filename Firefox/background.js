@@ -1,5 +1,4 @@
-// Track conversations by tab title
-let conversationsByTabTitle = {};
+// Captured conversations are kept by capture-store.js
 
 // Track requests with timestamps
 const requestTimestamps = new Map();
@@ -66,30 +65,16 @@ browser.webRequest.onCompleted.addListener(
           // Fallback to UUID or a generic name if 'name' is not available
           const conversationKey = jsonData.name || jsonData.uuid || 'Untitled Conversation';
           
-          // Skip if we've already processed this exact URL for this conversation key
-          if (conversationsByTabTitle[conversationKey]?.url === details.url) {
-            console.log('Skipping already processed conversation for key:', conversationKey);
-            return;
-          }
-
-          // Store the conversation data
-          conversationsByTabTitle[conversationKey] = {
-            url: details.url,
-            timestamp: new Date().toISOString(),
-            data: jsonData
-          };
-
-          
-          browser.storage.local.set(
-            { conversationsByTabTitle: conversationsByTabTitle }, 
-            () => {
-              if (chrome.runtime.lastError) {
-                console.error('Error storing conversations:', chrome.runtime.lastError);
-              } else {
-                console.log('Conversations stored in local storage');
-              }
+          // Store the conversation, skipping it if this version is already stored
+          try {
+            if (await saveCapture(conversationKey, details.url, jsonData)) {
+              console.log('Conversation stored for key:', conversationKey);
+            } else {
+              console.log('Skipping already stored conversation for key:', conversationKey);
             }
-          );
+          } catch (storeError) {
+            console.error('Error storing conversation:', storeError);
+          }
         } catch (jsonError) {
           console.warn('Invalid JSON response, ignoring:', jsonError);
         }
@@ -101,13 +86,8 @@ browser.webRequest.onCompleted.addListener(
   { urls: ['<all_urls>'] }
 );
 
-// Listen for storage changes to clear in-memory cache
-browser.storage.onChanged.addListener((changes, namespace) => {
-  if (namespace === 'local' && changes.conversationsByTabTitle && changes.conversationsByTabTitle.newValue === undefined) {
-    conversationsByTabTitle = {};
-    console.log('Cleared in-memory cache of conversations');
-  }
-});
+// Answer the popup's requests for captured conversations
+browser.runtime.onMessage.addListener((message) => handleCaptureMessage(message));
 
 // Helper function to validate conversation data structure
 function isValidConversationData(data) {
@@ -130,23 +110,15 @@ function isValidConversationData(data) {
 browser.tabs.onRemoved.addListener((tabId, removeInfo) => {
   browser.tabs.get(tabId).then((tab) => {
     const tabTitle = tab?.title || 'Untitled Tab';
-    delete conversationsByTabTitle[tabTitle];
+    forgetCachedCapture(tabTitle);
     console.log('Cleared cached conversation for closed tab:', tabTitle);
   }).catch(() => {});
 });
 
-// Periodic sync with browser.storage
-setInterval(() => {
-  browser.storage.local.get('conversationsByTabTitle').then((result) => {
-    const storedData = result.conversationsByTabTitle || {};
-    for (const [title, data] of Object.entries(storedData)) {
-      if (!conversationsByTabTitle[title] || 
-          new Date(data.timestamp) > new Date(conversationsByTabTitle[title].timestamp)) {
-        conversationsByTabTitle[title] = data;
-      }
-    }
-  });
-}, 5 * 60 * 1000);
+// Conversations captured by earlier versions were kept in browser.storage
+migrateLegacyCaptures(browser.storage.local).catch((error) => {
+  console.error('Error moving captured conversations to IndexedDB:', error);
+});
 
 // Ensure the service worker stays active
 browser.runtime.onInstalled.addListener(() => {
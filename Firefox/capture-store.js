@@ -0,0 +1,176 @@
+// Bounded store for captured conversations
+//
+// Every capture is written to IndexedDB as a single record, so storage writes
+// don't grow with the number of captured conversations. Only the most recently
+// used conversations are also kept in memory; the rest are read back from
+// IndexedDB when the popup asks for them.
+
+const CAPTURE_DB_NAME = 'claudeConversationCapture';
+const CAPTURE_DB_VERSION = 1;
+const MAX_CACHED_CONVERSATIONS = 5;
+
+// Recently used records by conversation key, least recently used first
+const captureCache = new Map();
+let captureDbPromise = null;
+
+function requestToPromise(request) {
+  return new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+  });
+}
+
+function transactionDone(transaction) {
+  return new Promise((resolve, reject) => {
+    transaction.oncomplete = () => resolve();
+    transaction.onerror = () => reject(transaction.error);
+    transaction.onabort = () => reject(transaction.error);
+  });
+}
+
+function openCaptureDb() {
+  if (!captureDbPromise) {
+    const request = indexedDB.open(CAPTURE_DB_NAME, CAPTURE_DB_VERSION);
+    request.onupgradeneeded = () => {
+      const db = request.result;
+      // Full conversation data, only read when a conversation is downloaded
+      db.createObjectStore('conversations', { keyPath: 'key' });
+      // Small summaries for listing and de-duplication
+      const summaries = db.createObjectStore('summaries', { keyPath: 'key' });
+      summaries.createIndex('uuid', 'uuid');
+    };
+    captureDbPromise = requestToPromise(request).catch((error) => {
+      captureDbPromise = null;
+      throw error;
+    });
+  }
+  return captureDbPromise;
+}
+
+function cacheCapture(record) {
+  captureCache.delete(record.key);
+  captureCache.set(record.key, record);
+  while (captureCache.size > MAX_CACHED_CONVERSATIONS) {
+    captureCache.delete(captureCache.keys().next().value);
+  }
+}
+
+function summarizeCapture(record) {
+  return {
+    key: record.key,
+    uuid: record.uuid,
+    updated_at: record.updated_at,
+    url: record.url,
+    timestamp: record.timestamp
+  };
+}
+
+// Stores a captured conversation under key. Resolves to false if the same
+// version of the conversation (same uuid and updated_at) is already stored.
+async function saveCapture(key, url, data, timestamp = new Date().toISOString()) {
+  const record = {
+    key: key,
+    uuid: data.uuid || null,
+    updated_at: data.updated_at || null,
+    url: url,
+    timestamp: timestamp,
+    data: data
+  };
+
+  const db = await openCaptureDb();
+  const transaction = db.transaction(['conversations', 'summaries'], 'readwrite');
+  const conversations = transaction.objectStore('conversations');
+  const summaries = transaction.objectStore('summaries');
+
+  const existing = record.uuid
+    ? await requestToPromise(summaries.index('uuid').getAll(record.uuid))
+    : [await requestToPromise(summaries.get(key))].filter(Boolean);
+
+  const unchanged = existing.some(summary =>
+    summary.key === key &&
+    (record.updated_at ? summary.updated_at === record.updated_at : summary.url === url));
+  if (unchanged) {
+    return false;
+  }
+
+  // A renamed conversation replaces the record stored under its old name
+  existing.filter(summary => summary.key !== key).forEach(summary => {
+    conversations.delete(summary.key);
+    summaries.delete(summary.key);
+    captureCache.delete(summary.key);
+  });
+
+  conversations.put(record);
+  summaries.put(summarizeCapture(record));
+  await transactionDone(transaction);
+
+  cacheCapture(record);
+  return true;
+}
+
+// Resolves to the summaries of all stored conversations, without their data
+async function listCaptures() {
+  const db = await openCaptureDb();
+  return requestToPromise(db.transaction('summaries').objectStore('summaries').getAll());
+}
+
+// Resolves to the full record for key, or null
+async function getCapture(key) {
+  if (captureCache.has(key)) {
+    const record = captureCache.get(key);
+    cacheCapture(record);
+    return record;
+  }
+  const db = await openCaptureDb();
+  const record = await requestToPromise(db.transaction('conversations').objectStore('conversations').get(key));
+  if (!record) {
+    return null;
+  }
+  cacheCapture(record);
+  return record;
+}
+
+async function clearCaptures() {
+  captureCache.clear();
+  const db = await openCaptureDb();
+  const transaction = db.transaction(['conversations', 'summaries'], 'readwrite');
+  transaction.objectStore('conversations').clear();
+  transaction.objectStore('summaries').clear();
+  await transactionDone(transaction);
+}
+
+// Drops a conversation from memory only; it stays available from IndexedDB
+function forgetCachedCapture(key) {
+  captureCache.delete(key);
+}
+
+// Moves conversations saved by earlier versions in storage.local into IndexedDB
+async function migrateLegacyCaptures(storageArea) {
+  const result = await storageArea.get('conversationsByTabTitle');
+  const legacy = result.conversationsByTabTitle;
+  if (!legacy) {
+    return;
+  }
+  for (const [key, conversation] of Object.entries(legacy)) {
+    if (conversation && conversation.data) {
+      await saveCapture(key, conversation.url, conversation.data, conversation.timestamp);
+    }
+  }
+  await storageArea.remove('conversationsByTabTitle');
+  captureCache.clear();
+  console.log('Moved previously captured conversations to IndexedDB');
+}
+
+// Answers requests from the popup. Resolves to the response, or undefined for other messages.
+function handleCaptureMessage(message) {
+  switch (message && message.type) {
+    case 'listCaptures':
+      return listCaptures();
+    case 'getCapture':
+      return getCapture(message.key);
+    case 'clearCaptures':
+      return clearCaptures().then(() => true);
+    default:
+      return undefined;
+  }
+}
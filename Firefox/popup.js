@@ -1,5 +1,19 @@
+// Summaries of the captured conversations, keyed by conversation name.
+// The conversation data itself is only fetched from the background script when downloading.
 let conversationsByTabTitle = {};
 
+async function loadCapturedConversations() {
+    const summaries = await browser.runtime.sendMessage({ type: 'listCaptures' });
+    if (summaries && summaries.error) {
+        throw new Error(summaries.error);
+    }
+    const conversations = {};
+    (summaries || []).forEach(summary => {
+        conversations[summary.key] = summary;
+    });
+    return conversations;
+}
+
 function createBasicElement(type, text, color) {
     const element = document.createElement(type);
     if (text) element.textContent = text;
@@ -94,8 +108,7 @@ function clearElement(element) {
 
 document.getElementById('viewBtn').addEventListener('click', async () => {
     try {
-        const storage = await browser.storage.local.get('conversationsByTabTitle');
-        conversationsByTabTitle = storage.conversationsByTabTitle || {};
+        conversationsByTabTitle = await loadCapturedConversations();
         
         const statusEl = document.getElementById('status');
         clearElement(statusEl);
@@ -123,8 +136,7 @@ document.getElementById('viewBtn').addEventListener('click', async () => {
 
 document.getElementById('downloadBtn').addEventListener('click', async () => {
     try {
-        const storage = await browser.storage.local.get('conversationsByTabTitle');
-        conversationsByTabTitle = storage.conversationsByTabTitle || {};
+        conversationsByTabTitle = await loadCapturedConversations();
         
         const statusEl = document.getElementById('status');
         clearElement(statusEl);
@@ -172,7 +184,7 @@ document.getElementById('downloadBtn').addEventListener('click', async () => {
 
 document.getElementById('clearBtn').addEventListener('click', async () => {
     try {
-        await browser.storage.local.remove('conversationsByTabTitle');
+        await browser.runtime.sendMessage({ type: 'clearCaptures' });
         conversationsByTabTitle = {};
         
         const statusEl = document.getElementById('status');
@@ -192,32 +204,39 @@ document.getElementById('clearBtn').addEventListener('click', async () => {
 });
 
 // Updated to use conversationName instead of tabTitle for download
-function downloadConversation(conversationName) {
+async function downloadConversation(conversationName) {
     // The 'Claude' tab title check is removed here as conversations are now stored by their actual names.
     // If a conversation's name happens to be 'Claude', it can still be downloaded.
     
-    const conversation = conversationsByTabTitle[conversationName];
-    
-    if (conversation) {
-        const jsonString = JSON.stringify(conversation.data);    
-        const printArtifacts = document.getElementById('printArtifacts').checked;
-        // Assuming generateHtml is available in the global scope via importScripts
-        const html = generateHtml(jsonString, printArtifacts);
-
-        const blob = new Blob([html], {type: 'text/html'});
-        const url = URL.createObjectURL(blob);
-        
-        const a = document.createElement('a');
-        a.href = url;
-        a.download = `chat_conversations_${conversation.timestamp.replace(/:/g, '-')}_${encodeURIComponent(conversationName)}.html`;
-        document.body.appendChild(a);
-        a.click();
-        document.body.removeChild(a);
-        
-        URL.revokeObjectURL(url);
+    try {
+        // Fetch the conversation data only now, when it is actually needed
+        const conversation = await browser.runtime.sendMessage({ type: 'getCapture', key: conversationName });
         
+        if (conversation) {
+            const jsonString = JSON.stringify(conversation.data);    
+            const printArtifacts = document.getElementById('printArtifacts').checked;
+            // Assuming generateHtml is available in the global scope via importScripts
+            const html = generateHtml(jsonString, printArtifacts);
+
+            const blob = new Blob([html], {type: 'text/html'});
+            const url = URL.createObjectURL(blob);
+            
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `chat_conversations_${conversation.timestamp.replace(/:/g, '-')}_${encodeURIComponent(conversationName)}.html`;
+            document.body.appendChild(a);
+            a.click();
+            document.body.removeChild(a);
+            
+            URL.revokeObjectURL(url);
+            
+            const statusEl = document.getElementById('status');
+            clearElement(statusEl);
+        }
+    } catch (error) {
+        console.error('Error downloading conversation:', error);
         const statusEl = document.getElementById('status');
-        clearElement(statusEl);
+        statusEl.textContent = `Error: ${error.message}`;
     }
 }
 // When the popup loads, restore the checkbox state
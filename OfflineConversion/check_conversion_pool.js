@@ -0,0 +1,116 @@
+// Headless check of the parallel conversion in Convert_All_Conversations.html
+//
+// Runs convertExportInWorkers() from conversion-pool.js under node, with
+// worker_threads standing in for Web Workers, and writes the pages and
+// index.html to an output directory. The export is passed to the pool as a
+// Blob, like the File the page hands over.
+//
+// Given the output directory of claude_export_formatter.py for the same
+// export, it also checks that both produced the same set of files and the same
+// index.html. Conversation pages are not compared: they come from
+// html-converter.js, whose differences from the Python converter are reported
+// by fuzz_formatter.py.
+//
+// Usage: node check_conversion_pool.js conversations.json OUTPUT_DIR [PYTHON_OUTPUT_DIR] [--workers N]
+//
+// Exits with status 1 if the conversion stops with an error or the outputs differ.
+
+const fs = require('fs');
+const path = require('path');
+const vm = require('vm');
+const { Blob } = require('buffer');
+const { Worker } = require('worker_threads');
+
+// Wraps a worker_threads Worker in the part of the Web Worker interface the pool uses
+function createWorker(source)
+{
+  const worker = new Worker(source, { eval: true });
+  return {
+    postMessage: (message) => worker.postMessage(message),
+    terminate: () => worker.terminate(),
+    addEventListener: (type, listener) => worker.on(type, type === 'message' ?
+      (data) => listener({ data: data }) :
+      (error) => listener({ message: String(error) }))
+  };
+}
+
+// Loads the browser scripts into a context of their own, as the page does with <script> tags
+function loadConverter()
+{
+  const context = vm.createContext({ console: console, URL: URL, require: require });
+  for (const script of ['html-converter.js', 'conversion-pool.js'])
+  {
+    vm.runInContext(fs.readFileSync(path.join(__dirname, script), 'utf8'), context, { filename: script });
+  }
+  return context;
+}
+
+function compareOutputs(outputDir, pythonDir)
+{
+  const problems = [];
+  const files = new Set(fs.readdirSync(outputDir).filter(name => name.endsWith('.html')));
+  const pythonFiles = new Set(fs.readdirSync(pythonDir).filter(name => name.endsWith('.html')));
+  for (const name of pythonFiles)
+  {
+    if (!files.has(name)) problems.push(`missing: ${name}`);
+  }
+  for (const name of files)
+  {
+    if (!pythonFiles.has(name)) problems.push(`not written by the Python version: ${name}`);
+  }
+  if (files.has('index.html') && pythonFiles.has('index.html') &&
+      fs.readFileSync(path.join(outputDir, 'index.html'), 'utf8') !== fs.readFileSync(path.join(pythonDir, 'index.html'), 'utf8'))
+  {
+    problems.push('index.html differs');
+  }
+  return problems;
+}
+
+async function main()
+{
+  const args = process.argv.slice(2);
+  let workerCount = 4;
+  const workersIndex = args.indexOf('--workers');
+  if (workersIndex !== -1)
+  {
+    workerCount = parseInt(args[workersIndex + 1], 10);
+    args.splice(workersIndex, 2);
+  }
+  if (args.length < 2 || !(workerCount > 0))
+  {
+    console.error('Usage: node check_conversion_pool.js conversations.json OUTPUT_DIR [PYTHON_OUTPUT_DIR] [--workers N]');
+    return 2;
+  }
+  const [inputFile, outputDir, pythonDir] = args;
+
+  const context = loadConverter();
+  fs.mkdirSync(outputDir, { recursive: true });
+  const file = new Blob([fs.readFileSync(inputFile)], { type: 'application/json' });
+
+  const started = Date.now();
+  const result = await context.convertExportInWorkers(file, {
+    workerCount: workerCount,
+    createWorker: createWorker,
+    onFile: (filename, html) => fs.writeFileSync(path.join(outputDir, filename), html)
+  });
+  fs.writeFileSync(path.join(outputDir, 'index.html'), context.generateToc(result.entries));
+  console.log(`Converted ${result.entries.length} of ${result.total} conversations with ${workerCount} workers ` +
+              `in ${Date.now() - started} ms (${result.deletedCount} deleted, ${result.failedCount} failed)`);
+
+  let problems = [];
+  if (pythonDir)
+  {
+    problems = compareOutputs(outputDir, pythonDir);
+    console.log(`Compared file names and index.html with ${pythonDir}`);
+  }
+  problems.forEach(problem => console.log(`PROBLEM: ${problem}`));
+  return problems.length ? 1 : 0;
+}
+
+main().then(
+  (status) => process.exit(status),
+  (error) =>
+  {
+    console.error(error);
+    process.exit(1);
+  });
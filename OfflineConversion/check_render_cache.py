@@ -0,0 +1,95 @@
+"""
+Checks that the render cache of claude_export_formatter.py doesn't change the output.
+
+Renders the same conversations without a cache, then twice with a fresh
+RenderCache (once filling it, once from cached fragments) and compares the
+pages. The conversations mix fixed cases, such as text containing the cache's
+own placeholders, with random text built from the fuzz_formatter.py tokens.
+
+Usage: python check_render_cache.py [--iterations N] [--seed N]
+
+Exits with status 1 if any output differs.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+
+import claude_export_formatter as formatter
+from fuzz_formatter import random_text
+
+known_texts = [
+    "plain \x00artifact-3 nul",
+    "\x00base and \x00base_artifact-0.html",
+    '<antArtifact title="T" language="python">\x00artifact-0</antArtifact> after',
+    '<antArtifact title="Big">' + "x" * 2000 + "</antArtifact>",
+    "`code` and ```py\nblock\n```",
+]
+
+# Rendering options to compare, as keyword arguments of generate_html_pages()
+option_sets = [
+    {},
+    {"print_artifacts": True},
+    {"max_artifact_size": 500},
+    {"max_message_size": 300, "max_artifact_size": 500},
+]
+
+
+def conversation(index, texts):
+    """Returns a conversation JSON string with one message per text."""
+    return json.dumps({
+        "name": f"Conversation {index}",
+        "chat_messages": [
+            {"sender": "human" if n % 2 == 0 else "assistant",
+             "created_at": f"2024-01-01T00:{n // 60:02d}:{n % 60:02d}Z",
+             "content": [{"type": "text", "text": text}]}
+            for n, text in enumerate(texts)
+        ],
+    })
+
+
+def render_all(conversations, options, render_cache=None):
+    return [formatter.generate_html_pages(json_data, f"conversation{index}", render_cache=render_cache, **options)
+            for index, json_data in enumerate(conversations)]
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Checks that the render cache doesn't change the output.")
+    arg_parser.add_argument("--iterations", type=int, default=50, help="random conversations (default: 50)")
+    arg_parser.add_argument("--seed", type=int, default=None, help="random seed, to reproduce a run")
+    args = arg_parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    print(f"Seed: {seed}")
+
+    # Repeat texts across conversations, so later renders hit fragments cached by earlier ones
+    texts = known_texts + [random_text(rng, 30) for _ in range(args.iterations)]
+    conversations = [conversation(0, known_texts)]
+    conversations += [conversation(index, rng.sample(texts, 4)) for index in range(1, args.iterations + 1)]
+
+    problems = 0
+    with tempfile.TemporaryDirectory() as directory:
+        for number, options in enumerate(option_sets):
+            expected = render_all(conversations, options)
+            render_cache = formatter.RenderCache(os.path.join(directory, f"cache{number}.db"))
+            try:
+                for run in ("filling", "reusing"):
+                    actual = render_all(conversations, options, render_cache)
+                    for index, (expected_pages, actual_pages) in enumerate(zip(expected, actual)):
+                        if expected_pages != actual_pages:
+                            problems += 1
+                            print(f"DIFF: conversation {index} with {options or 'default options'}, {run} the cache")
+            finally:
+                render_cache.close()
+            print(f"Compared {len(conversations)} conversations with {options or 'default options'}: "
+                  f"{render_cache.hits} cache hits, {render_cache.misses} misses")
+
+    print(f"{problems} problem(s) found")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
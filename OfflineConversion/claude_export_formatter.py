@@ -1,20 +1,52 @@
+import argparse
 import json
 import re
 import html
 import datetime
 import math
-import sys
 import os
+import hashlib
+import sqlite3
+import time
+import gzip
+import concurrent.futures
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None  # .br files are only written when the brotli package is installed
 
 type_lookup = {
     "application/vnd.ant.react": "jsx",
     "text/html": "html"
 }
 
+artifact_pattern = r'<antArtifact[^>]*>([\s\S]*?)(<\/antArtifact>|$)'
+
+# Artifacts and ``` code blocks, which message text is never truncated inside of
+protected_block_pattern = artifact_pattern + r'|```\w*\n[\s\S]*?```'
+
+incomplete_artifact_notice = "\n\n\n THIS ARTIFACT IS INCOMPLETE BECAUSE THE MAX MESSAGE LENGTH WAS EXCEEDED."
+
 def escape_html(text):
     """Escapes HTML special characters."""
     return html.escape(text, quote=True)
 
+def parse_timestamp(value):
+    """Parses an ISO 8601 timestamp as written in Claude exports."""
+    return datetime.datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+def extract_attributes(tag):
+    """Extracts the attributes of an antArtifact opening tag into a dict."""
+    attributes = {}
+    attr_regex = r'(\w+)=("([^"]*)"|\'([^\']*)\')'
+    for match in re.finditer(attr_regex, tag):
+        key = match.group(1)
+        value = match.group(3) or match.group(4)
+        attributes[key] = value
+    return attributes
+
 def replace_inline_code(text):
     """Replaces inline code blocks with HTML tags."""
 
@@ -163,18 +195,42 @@ def replace_inline_code(text):
 
 artifact_counter = 0
 
-def replace_artifact_tags(input_text, artifact_panels, print_artifacts=False):
-    """Replaces artifact tags with HTML elements."""
-    global artifact_counter
+# Bump whenever a change to the renderer changes its output, so cached fragments are discarded
+renderer_version = "1"
 
-    def extract_attributes(tag):
-        attributes = {}
-        attr_regex = r'(\w+)=("([^"]*)"|\'([^\']*)\')'
-        for match in re.finditer(attr_regex, tag):
-            key = match.group(1)
-            value = match.group(3) or match.group(4)
-            attributes[key] = value
-        return attributes
+def utf8_size(text):
+    """Returns the size of text in bytes when written out as UTF-8."""
+    return len(text.encode("utf-8"))
+
+
+def external_file_link(filename, title, size):
+    """Returns the button-style link used for content moved to a separate file."""
+    return f"""
+          <div class="artifact-wrapper">
+            <p class="artifact-button-wrapper">
+              <a class="artifact-button" href="{escape_html(filename)}" target="_blank">
+                <svg class="artifact-icon" width="16" height="16" viewBox="0 0 16 16">
+                  <path fill="currentColor" d="M14 4.5V14a2 2 0 0 1-2 2H4a2 2 0 0 1-2-2V2a2 2 0 0 1 2-2h5.5L14 4.5zm-3 0A1.5 1.5 0 0 1 9.5 3V1H4a1 1 0 0 0-1 1v12a1 1 0 0 0 1 1h8a1 1 0 0 0 1-1V4.5h-2z"/>
+                </svg>
+                <span class="artifact-title">{title}</span>
+              </a>
+              <span class="external-size">{math.ceil(size / 1024)} KB, opens in a separate page</span>
+            </p>
+          </div>
+        """
+
+
+def replace_artifact_tags(input_text, artifact_panels, print_artifacts=False,
+                          max_artifact_size=None, external_files=None, base_filename=None,
+                          artifact_id_prefix="artifact-"):
+    """
+    Replaces artifact tags with HTML elements.
+
+    Artifacts larger than max_artifact_size bytes are not inlined; instead a
+    (filename, title, lang, content) tuple is appended to external_files and
+    the artifact is rendered as a link to that file.
+    """
+    global artifact_counter
 
     def create_artifact_panel(artifact_id, title, content, lang):
         artifact_panels.append(f"""
@@ -197,11 +253,19 @@ def replace_artifact_tags(input_text, artifact_panels, print_artifacts=False):
         opening_tag = full_match[:full_match.find('>') + 1]
         attributes = extract_attributes(opening_tag)
         lang = attributes.get('language', type_lookup.get(attributes.get('type'), ""))
-        artifact_id = f"artifact-{artifact_counter}"
+        artifact_id = f"{artifact_id_prefix}{artifact_counter}"
         title = attributes.get('title', "Untitled")
 
         if not has_closing_tag:
-            content += "\n\n\n THIS ARTIFACT IS INCOMPLETE BECAUSE THE MAX MESSAGE LENGTH WAS EXCEEDED."
+            content += incomplete_artifact_notice
+
+        if max_artifact_size and external_files is not None:
+            size = utf8_size(content)
+            if size > max_artifact_size:
+                filename = f"{base_filename}_{artifact_id}.html"
+                external_files.append((filename, title, lang, content))
+                artifact_counter += 1
+                return external_file_link(filename, title, size)
 
         create_artifact_panel(artifact_id, title, content, lang)
         artifact_counter += 1
@@ -223,86 +287,362 @@ def replace_artifact_tags(input_text, artifact_panels, print_artifacts=False):
           </div>
         """
 
-    pattern = r'<antArtifact[^>]*>([\s\S]*?)(<\/antArtifact>|$)'
-    result = re.sub(pattern, replace_match, input_text)
+    result = re.sub(artifact_pattern, replace_match, input_text)
     return result
 
 
-def generate_html(json_data, print_artifacts=False):
-    """Generates HTML from the given JSON data."""
+def extract_artifacts(text):
+    """Returns the antArtifact blocks in a message text as a list of dicts."""
+    artifacts = []
+    for match in re.finditer(artifact_pattern, text):
+        full_match = match.group(0)
+        attributes = extract_attributes(full_match[:full_match.find('>') + 1])
+        artifacts.append({
+            "title": attributes.get('title', "Untitled"),
+            "language": attributes.get('language', type_lookup.get(attributes.get('type'), "")),
+            "attributes": attributes,
+            "content": match.group(1),
+            "complete": match.group(2) == "</antArtifact>",
+        })
+    return artifacts
+
+
+def normalise_timestamp(value):
+    """Returns an ISO 8601 string for an export timestamp, or None if it can't be parsed."""
     try:
-        parsed = json.loads(json_data)
-        if not parsed or "chat_messages" not in parsed:
-            return ""
-    except json.JSONDecodeError:
-        return ""
+        return parse_timestamp(value).isoformat()
+    except (AttributeError, TypeError, ValueError):
+        return None
 
-    # Sort chat_messages by timestamp
+
+def conversation_records(conversation):
+    """
+    Yields normalised records for a conversation: one "conversation" record
+    followed by one "message" record per chat message, in timestamp order.
+    """
+    messages = list(conversation.get("chat_messages") or [])
     try:
-        parsed["chat_messages"].sort(key=lambda x: datetime.datetime.fromisoformat(x["created_at"].replace('Z', '+00:00')))
+        messages.sort(key=lambda x: parse_timestamp(x["created_at"]))
     except (KeyError, ValueError) as e:
         print(f"Warning: Could not sort chat messages due to timestamp issues: {e}")
 
-    artifact_panels = []
-
-    messages = ""
-    for message in parsed["chat_messages"]:
-        message_content = ""
-        for content in message["content"]:
+    conversation_uuid = conversation.get("uuid")
+    yield {
+        "record": "conversation",
+        "uuid": conversation_uuid,
+        "name": conversation.get("name"),
+        "created_at": normalise_timestamp(conversation.get("created_at")),
+        "updated_at": normalise_timestamp(conversation.get("updated_at")),
+        "message_count": len(messages),
+    }
+
+    for index, message in enumerate(messages):
+        texts = []
+        artifacts = []
+        repl = []
+        for content in message.get("content") or []:
             if content.get("type") == "tool_use" and content.get("name") == "repl":
-                artifact_id = f"repl-{content['id']}"
-                artifact_panels.append(f"""
-                  <div class="artifact-panel" id="{artifact_id}">
-                    <div class="artifact-panel-header">
-                      <h3>Analysis</h3>
-                      <button class="close-panel" aria-label="Close panel">&times;</button>
-                    </div>
-                    <div class="artifact-panel-content">
-                      <pre class="code-block javascript">{escape_html(content["input"]["code"].strip())}</pre>
-                    </div>
-                  </div>
-                """)
-                message_content += f"""
-                    <div class="artifact-wrapper">
-                      <p class="artifact-button-wrapper {'print-enabled' if print_artifacts else ''}">
-                        <button class="artifact-button" data-artifact-id="{artifact_id}">
-                          <svg class="artifact-icon" width="16" height="16" viewBox="0 0 16 16">
-                            <path fill="currentColor" d="M14 4.5V14a2 2 0 0 1-2 2H4a2 2 0 0 1-2-2V2a2 2 0 0 1 2-2h5.5L14 4.5zm-3 0A1.5 1.5 0 0 1 9.5 3V1H4a1 1 0 0 0-1 1v12a1 1 0 0 0 1 1h8a1 1 0 0 0 1-1V4.5h-2z"/>
-                          </svg>
-                          <span class="artifact-title">Analysis</span>
-                        </button>
-                      </p>
-                      <div class="artifact-inline {'print-enabled' if print_artifacts else ''}">
-                        <h4>Analysis</h4>
-                        <pre class="code-block javascript">{escape_html(content["input"]["code"].strip())}</pre>
-                      </div>
-                    </div>
-                  """
+                repl.append({"id": content.get("id"), "code": content["input"]["code"].strip()})
             elif content.get("text"):
-                processed_text = replace_artifact_tags(content["text"], artifact_panels, print_artifacts)
-                processed_text = replace_inline_code(processed_text)
-                message_content += processed_text
-            else:
-                message_content += escape_html(json.dumps(content))
+                texts.append(content["text"])
+                artifacts.extend(extract_artifacts(content["text"]))
+
+        yield {
+            "record": "message",
+            "conversation_uuid": conversation_uuid,
+            "index": index,
+            "uuid": message.get("uuid"),
+            "sender": message.get("sender"),
+            "created_at": normalise_timestamp(message.get("created_at")),
+            "text": "\n".join(texts),
+            "artifacts": artifacts,
+            "repl": repl,
+        }
+
+
+def write_ndjson(records, outfile):
+    """
+    Writes records to an open text file as newline-delimited JSON.
+
+    All records are built before any is written, so an error part way through
+    a conversation doesn't leave a partial conversation in the file.
+    """
+    records = list(records)
+    for record in records:
+        outfile.write(json.dumps(record, ensure_ascii=False) + "\n")
+    outfile.flush()
+
+
+class RenderCache:
+    """
+    Persistent SQLite cache of rendered message text, keyed by a hash of the
+    text, the rendering options and renderer_version.
 
-        timestamp = datetime.datetime.fromisoformat(message["created_at"].replace('Z', '+00:00')).strftime(
-            "%b %d, %Y %I:%M %p")
+    Entries are evicted least recently used first once the cached fragments
+    exceed max_size bytes. Changes are saved by commit() and close().
+    """
 
-        message_class = message["sender"].lower()
+    def __init__(self, path, max_size=256 * 1024 * 1024):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS fragments "
+            "(key TEXT PRIMARY KEY, value TEXT, size INTEGER, last_used REAL)")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS fragments_last_used ON fragments (last_used)")
+
+        row = self.connection.execute("SELECT value FROM meta WHERE name = 'renderer_version'").fetchone()
+        if not row or row[0] != renderer_version:
+            # Fragments from another renderer version can never be hit again
+            self.connection.execute("DELETE FROM fragments")
+            self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('renderer_version', ?)",
+                                    (renderer_version,))
+        self.total_size = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM fragments").fetchone()[0]
+
+    @staticmethod
+    def key(text, *options):
+        """Returns the cache key for text rendered with the given options."""
+        return hashlib.sha256(json.dumps([renderer_version, options, text]).encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Returns the cached value for key, or None."""
+        row = self.connection.execute("SELECT value FROM fragments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE fragments SET last_used = ? WHERE key = ?", (time.time(), key))
+        return json.loads(row[0])
+
+    def put(self, key, value):
+        """Stores a JSON-serialisable value, evicting old entries to stay within max_size."""
+        data = json.dumps(value)
+        size = len(data)
+        if size > self.max_size:
+            return
+        old = self.connection.execute("SELECT size FROM fragments WHERE key = ?", (key,)).fetchone()
+        if old:
+            self.total_size -= old[0]
+        self.connection.execute("INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?)",
+                                (key, data, size, time.time()))
+        self.total_size += size
+
+        if self.total_size > self.max_size:
+            evicted = []
+            for old_key, old_size in self.connection.execute(
+                    "SELECT key, size FROM fragments ORDER BY last_used"):
+                if self.total_size <= self.max_size:
+                    break
+                if old_key != key:
+                    evicted.append((old_key,))
+                    self.total_size -= old_size
+            self.connection.executemany("DELETE FROM fragments WHERE key = ?", evicted)
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+
+def render_text(text, print_artifacts=False, max_artifact_size=None, base_filename="conversation",
+                render_cache=None):
+    """
+    Converts message text to HTML with replace_artifact_tags and replace_inline_code.
+
+    Returns (html, artifact_panels, external_files). With a render_cache, the
+    text is rendered with placeholder artifact ids and file names so that the
+    cached fragment can be reused wherever the same text appears again.
+    Text containing NUL characters is never cached, as it could contain the
+    placeholders themselves.
+    """
+    global artifact_counter
+
+    if render_cache is None or "\x00" in text:
+        artifact_panels = []
+        external_files = []
+        processed_text = replace_artifact_tags(text, artifact_panels, print_artifacts,
+                                               max_artifact_size, external_files, base_filename)
+        return replace_inline_code(processed_text), artifact_panels, external_files
+
+    key = RenderCache.key(text, print_artifacts, max_artifact_size)
+    cached = render_cache.get(key)
+    if cached is None:
+        first_artifact = artifact_counter
+        artifact_counter = 0
+        artifact_panels = []
+        external_files = []
+        try:
+            processed_text = replace_artifact_tags(text, artifact_panels, print_artifacts, max_artifact_size,
+                                                   external_files, "\x00base", "\x00artifact-")
+            processed_text = replace_inline_code(processed_text)
+            cached = {"html": processed_text, "panels": artifact_panels,
+                      "files": external_files, "artifacts": artifact_counter}
+        finally:
+            artifact_counter = first_artifact
+        render_cache.put(key, cached)
+
+    def fill_placeholders(fragment, filename=None):
+        fragment = re.sub(r"\x00artifact-(\d+)", lambda m: f"artifact-{artifact_counter + int(m.group(1))}", fragment)
+        return fragment.replace("\x00base", base_filename if filename else escape_html(base_filename))
+
+    processed_text = fill_placeholders(cached["html"])
+    artifact_panels = [fill_placeholders(panel) for panel in cached["panels"]]
+    external_files = [(fill_placeholders(filename, True), title, lang, content)
+                      for filename, title, lang, content in cached["files"]]
+    artifact_counter += cached["artifacts"]
+    return processed_text, artifact_panels, external_files
+
+
+def truncate_utf8(text, max_size):
+    """Returns the longest prefix of text that is at most max_size bytes in UTF-8."""
+    return text.encode("utf-8")[:max_size].decode("utf-8", errors="ignore")
+
+
+def truncation_point(text, max_message_size, max_artifact_size=None):
+    """
+    Returns the index to cut message text at so that at most max_message_size
+    bytes remain, or None if the text is within the limit.
+
+    Artifacts over max_artifact_size bytes are moved to their own files, so
+    they don't count towards the limit. The text is never cut inside an
+    artifact or a ``` code block; one that doesn't fit is left out entirely.
+    """
+    budget = max_message_size
+    position = 0
+    for match in re.finditer(protected_block_pattern, text):
+        plain_size = utf8_size(text[position:match.start()])
+        if plain_size > budget:
+            return position + len(truncate_utf8(text[position:match.start()], budget))
+        budget -= plain_size
+
+        block_size = utf8_size(match.group(0))
+        if match.group(1) is not None and max_artifact_size:
+            content = match.group(1)
+            if match.group(2) != "</antArtifact>":
+                content += incomplete_artifact_notice
+            if utf8_size(content) > max_artifact_size:
+                block_size = 0  # only a link to the artifact's own file stays in the message
+        if block_size > budget:
+            return match.start()
+        budget -= block_size
+        position = match.end()
+
+    if utf8_size(text[position:]) > budget:
+        return position + len(truncate_utf8(text[position:], budget))
+    return None
+
+
+def render_message(message, message_index=0, print_artifacts=False, base_filename="conversation",
+                   max_message_size=None, max_artifact_size=None, render_cache=None):
+    """
+    Renders a single chat message.
 
-        messages += f"""
+    Returns (message_html, artifact_panels, external_files, message_pages),
+    where external_files lists the (filename, title, lang, content) tuples for
+    artifacts over max_artifact_size bytes, and message_pages lists the
+    (filename, message_html, artifact_panels) of the full versions of texts
+    that were truncated to max_message_size bytes.
+    """
+    global artifact_counter
+
+    artifact_panels = []
+    external_files = []
+    message_pages = []
+    message_content = ""
+
+    timestamp = datetime.datetime.fromisoformat(message["created_at"].replace('Z', '+00:00')).strftime(
+        "%b %d, %Y %I:%M %p")
+
+    message_class = message["sender"].lower()
+
+    def message_block(content_html):
+        return f"""
           <div class="message {message_class}">
             <div class="message-header">
               <span class="sender">{escape_html(message["sender"])}</span>
               <span class="timestamp">{timestamp}</span>
             </div>
             <div class="message-content">
-              {message_content}
+              {content_html}
             </div>
           </div>
         """
 
-    style_sheet = """
+    for content_index, content in enumerate(message["content"]):
+        if content.get("type") == "tool_use" and content.get("name") == "repl":
+            artifact_id = f"repl-{content['id']}"
+            artifact_panels.append(f"""
+              <div class="artifact-panel" id="{artifact_id}">
+                <div class="artifact-panel-header">
+                  <h3>Analysis</h3>
+                  <button class="close-panel" aria-label="Close panel">&times;</button>
+                </div>
+                <div class="artifact-panel-content">
+                  <pre class="code-block javascript">{escape_html(content["input"]["code"].strip())}</pre>
+                </div>
+              </div>
+            """)
+            message_content += f"""
+                <div class="artifact-wrapper">
+                  <p class="artifact-button-wrapper {'print-enabled' if print_artifacts else ''}">
+                    <button class="artifact-button" data-artifact-id="{artifact_id}">
+                      <svg class="artifact-icon" width="16" height="16" viewBox="0 0 16 16">
+                        <path fill="currentColor" d="M14 4.5V14a2 2 0 0 1-2 2H4a2 2 0 0 1-2-2V2a2 2 0 0 1 2-2h5.5L14 4.5zm-3 0A1.5 1.5 0 0 1 9.5 3V1H4a1 1 0 0 0-1 1v12a1 1 0 0 0 1 1h8a1 1 0 0 0 1-1V4.5h-2z"/>
+                      </svg>
+                      <span class="artifact-title">Analysis</span>
+                    </button>
+                  </p>
+                  <div class="artifact-inline {'print-enabled' if print_artifacts else ''}">
+                    <h4>Analysis</h4>
+                    <pre class="code-block javascript">{escape_html(content["input"]["code"].strip())}</pre>
+                  </div>
+                </div>
+              """
+        elif content.get("text"):
+            text = content["text"]
+            cut = truncation_point(text, max_message_size, max_artifact_size) if max_message_size else None
+            if cut is None:
+                processed_text, text_panels, text_files = render_text(text, print_artifacts, max_artifact_size,
+                                                                      base_filename, render_cache)
+                artifact_panels.extend(text_panels)
+                external_files.extend(text_files)
+                message_content += processed_text
+                continue
+
+            # Keep the start of the message inline and render the full text on its own page.
+            # The start is rendered with the same artifact ids, so both refer to the same artifact files.
+            filename = f"{base_filename}_message-{message_index}-{content_index}.html"
+            first_artifact = artifact_counter
+            full_text, full_panels, full_files = render_text(text, print_artifacts, max_artifact_size,
+                                                             base_filename, render_cache)
+            next_artifact = artifact_counter
+            artifact_counter = first_artifact
+            processed_text, text_panels, _ = render_text(text[:cut], print_artifacts, max_artifact_size,
+                                                         base_filename, render_cache)
+            artifact_counter = next_artifact
+
+            full_message = message_block(full_text)
+            message_pages.append((filename, full_message, full_panels))
+            artifact_panels.extend(text_panels)
+            external_files.extend(full_files)
+            message_content += processed_text
+            message_content += f"""
+                <p class="truncated-notice">This message was truncated to its first {max_message_size} bytes of text.</p>
+                {external_file_link(filename, "Full message", utf8_size(full_message))}
+              """
+        else:
+            message_content += escape_html(json.dumps(content))
+
+    return message_block(message_content), artifact_panels, external_files, message_pages
+
+
+page_style_sheet = """
         <style>
           body {
             font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, Oxygen-Sans, Ubuntu, Cantarell, "Helvetica Neue", sans-serif;
@@ -511,6 +851,25 @@ def generate_html(json_data, print_artifacts=False):
 
       .bulleted-list li {
         margin-bottom: 8px;
+      }
+      .page-nav {
+        display: flex;
+        justify-content: space-between;
+        align-items: center;
+        margin-bottom: 24px;
+        color: #6b7280;
+      }
+      a.artifact-button {
+        text-decoration: none;
+      }
+      .external-size {
+        margin-left: 12px;
+        color: #6b7280;
+        font-size: 0.875rem;
+      }
+      .truncated-notice {
+        color: #6b7280;
+        font-style: italic;
       }
           @media print {
             body {
@@ -532,11 +891,15 @@ def generate_html(json_data, print_artifacts=False):
             .artifact-inline.print-enabled {
               display: block;
             }
+            .page-nav {
+              display: none;
+            }
           }
         </style>
       """
 
-    script = """
+
+page_script = """
       <script>
         document.addEventListener('DOMContentLoaded', function() {
           const container = document.querySelector('.container');
@@ -594,38 +957,229 @@ def generate_html(json_data, print_artifacts=False):
       </script>
     """
 
-    html_output = f"""
+
+def build_page(title, messages, artifact_panels, navigation=""):
+    """Assembles a complete conversation page from rendered messages and artifact panels."""
+    return f"""
       <!DOCTYPE html>
       <html>
       <head>
         <meta charset="UTF-8">
         <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>{escape_html(parsed["name"])}</title>
-        {style_sheet}
+        <title>{escape_html(title)}</title>
+        {page_style_sheet}
       </head>
       <body>
         <div class="container">
           <div class="chat-container">
-            <div class="conversation-title">{escape_html(parsed["name"])}</div>
-            {messages}
+            <div class="conversation-title">{escape_html(title)}</div>
+            {navigation}{messages}{navigation}
           </div>
           <div class="artifact-container">
-            {"".join(artifact_panels)}
+            {artifact_panels}
           </div>
         </div>
-        {script}
+        {page_script}
       </body>
       </html>
     """
 
-    return html_output
+
+def build_external_page(title, lang, content):
+    """Builds the standalone page for an artifact or message moved out of a conversation page."""
+    return f"""
+      <!DOCTYPE html>
+      <html>
+      <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>{escape_html(title)}</title>
+        {page_style_sheet}
+      </head>
+      <body>
+        <div class="container">
+          <div class="chat-container">
+            <div class="conversation-title">{escape_html(title)}</div>
+            <pre class="code-block {lang}">{escape_html(content)}</pre>
+          </div>
+        </div>
+      </body>
+      </html>
+    """
 
 
-def process_claude_export(input_file, output_dir):
+def page_navigation(page_names, index):
+    """Returns the prev/next links for page number index of a split conversation."""
+    previous_link = f'<a href="{escape_html(page_names[index - 1])}">&larr; Previous</a>' if index > 0 else '<span></span>'
+    next_link = f'<a href="{escape_html(page_names[index + 1])}">Next &rarr;</a>' if index + 1 < len(page_names) else '<span></span>'
+    return f"""
+            <div class="page-nav">
+              {previous_link}
+              <span class="page-number">Page {index + 1} of {len(page_names)}</span>
+              {next_link}
+            </div>
+    """
+
+
+def generate_html_pages(json_data, base_filename, print_artifacts=False, max_message_size=None,
+                        max_artifact_size=None, max_page_messages=None, max_page_size=None,
+                        render_cache=None):
+    """
+    Generates the HTML files for a conversation, applying optional size limits.
+
+    Returns a list of (filename, html) tuples, or an empty list if json_data
+    is not a conversation. The first entry is always the first page, named
+    base_filename.html. When the conversation has more than max_page_messages
+    messages or max_page_size bytes, it is split into numbered pages
+    (base_filename_page2.html, ...) linked with prev/next links. Message text
+    and artifacts over their size limits follow the pages as separate files.
+    Message text is rendered through render_cache when one is given.
+    """
+    global artifact_counter
+
+    try:
+        parsed = json.loads(json_data)
+        if not parsed or "chat_messages" not in parsed:
+            return []
+    except json.JSONDecodeError:
+        return []
+
+    # Sort chat_messages by timestamp
+    try:
+        parsed["chat_messages"].sort(key=lambda x: datetime.datetime.fromisoformat(x["created_at"].replace('Z', '+00:00')))
+    except (KeyError, ValueError) as e:
+        print(f"Warning: Could not sort chat messages due to timestamp issues: {e}")
+
+    # Artifacts are numbered per conversation, so their ids and file names don't
+    # change when other conversations in the export gain or lose artifacts
+    artifact_counter = 0
+
+    pages = []  # each page is a list of (message_html, artifact_panels)
+    current_page = []
+    current_size = 0
+    external_files = []
+    message_pages = []
+
+    for message_index, message in enumerate(parsed["chat_messages"]):
+        message_html, artifact_panels, message_files, full_messages = render_message(
+            message, message_index, print_artifacts, base_filename, max_message_size, max_artifact_size,
+            render_cache)
+        external_files.extend(message_files)
+        message_pages.extend(full_messages)
+
+        size = utf8_size(message_html) + sum(utf8_size(panel) for panel in artifact_panels) if max_page_size else 0
+        if current_page and ((max_page_messages and len(current_page) >= max_page_messages) or
+                             (max_page_size and current_size + size > max_page_size)):
+            pages.append(current_page)
+            current_page = []
+            current_size = 0
+
+        current_page.append((message_html, artifact_panels))
+        current_size += size
+
+    pages.append(current_page)
+
+    page_names = [f"{base_filename}.html"] + [f"{base_filename}_page{n}.html" for n in range(2, len(pages) + 1)]
+    output = []
+    for index, page in enumerate(pages):
+        navigation = page_navigation(page_names, index) if len(pages) > 1 else ""
+        messages = "".join(message_html for message_html, _ in page)
+        artifact_panels = "".join(panel for _, panels in page for panel in panels)
+        output.append((page_names[index], build_page(parsed["name"], messages, artifact_panels, navigation)))
+
+    for filename, message_html, artifact_panels in message_pages:
+        output.append((filename, build_page(f"{parsed['name']}: Full message", message_html,
+                                            "".join(artifact_panels))))
+
+    for filename, title, lang, content in external_files:
+        output.append((filename, build_external_page(f"{parsed['name']}: {title}", lang, content)))
+
+    return output
+
+
+def generate_html(json_data, print_artifacts=False):
+    """Generates HTML from the given JSON data."""
+    pages = generate_html_pages(json_data, "conversation", print_artifacts)
+    return pages[0][1] if pages else ""
+
+
+class Precompressor:
+    """
+    Writes pre-compressed .gz (and .br, if brotli is installed) siblings of
+    output files on worker threads, so compression overlaps with rendering.
+    Files smaller than min_size bytes are not compressed.
+
+    At most max_pending files wait to be compressed at a time; submit() blocks
+    until there is room, so the queued output doesn't build up in memory when
+    compression falls behind rendering.
+    """
+
+    def __init__(self, min_size=1024, workers=None, max_pending=None):
+        self.min_size = min_size
+        workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+        self.pending = threading.Semaphore(max_pending or 2 * workers)
+        self.futures = {}
+
+    def submit(self, path, text):
+        """Queues compressed copies of text, which has just been written to path."""
+        data = text.encode("utf-8")
+        if len(data) < self.min_size:
+            # Don't leave a sibling from an earlier run that no longer matches the file
+            for suffix in (".gz", ".br"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+            return
+        self.pending.acquire()
+        future = self.executor.submit(self.compress, path, data)
+        future.add_done_callback(lambda _: self.pending.release())
+        self.futures[future] = path
+
+    @staticmethod
+    def compress(path, data):
+        with open(path + ".gz", "wb") as outfile:
+            outfile.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli:
+            with open(path + ".br", "wb") as outfile:
+                outfile.write(brotli.compress(data, mode=brotli.MODE_TEXT))
+        elif os.path.exists(path + ".br"):
+            # Without brotli, a .br from an earlier run would no longer match the file
+            os.remove(path + ".br")
+
+    def close(self):
+        """Waits for all queued files to be compressed and reports any failures."""
+        compressed = 0
+        for future in concurrent.futures.as_completed(self.futures):
+            try:
+                future.result()
+                compressed += 1
+            except Exception as e:
+                print(f"Error compressing '{self.futures[future]}': {e}")
+        self.executor.shutdown()
+        print(f"Pre-compressed {compressed} files ({'gzip and brotli' if brotli else 'gzip'}).")
+
+
+def process_claude_export(input_file, output_dir, ndjson_file=None, max_message_size=None,
+                          max_artifact_size=None, max_page_messages=None, max_page_size=None,
+                          cache_file=None, cache_size=256 * 1024 * 1024,
+                          precompress=False, compress_min_size=1024):
     """
     Reads a Claude chat archive JSON file, splits it into multiple HTML files,
     one for each conversation with content in the input file,
     and creates a table of contents page with links to each HTML file.
+
+    If ndjson_file is given, the normalised records from conversation_records()
+    are also streamed to that file as each conversation is processed.
+
+    The size limits are passed to generate_html_pages(); the table of contents
+    always links to the first page of a conversation.
+
+    If cache_file is given, rendered message text is kept in a RenderCache of
+    at most cache_size bytes there, so unchanged messages are not re-rendered
+    on the next run.
+
+    If precompress is set, every HTML file of at least compress_min_size bytes,
+    including index.html, also gets .gz and .br siblings for static hosting.
     """
 
     if not os.path.exists(output_dir):
@@ -645,98 +1199,147 @@ def process_claude_export(input_file, output_dir):
         print("Error: The JSON data should be a list of conversations.")
         return
 
-    conversations = []  # stores each conversation as a tuple
-    deleted_count = 0
-
-    for conversation in data:
-        if not isinstance(conversation, dict):
-            print("Warning: Found a non-dictionary element in the conversation list. Skipping.")
-            continue
-
-        # Check for content. Conversations without chat_messages are considered deleted
-        if ("chat_messages" not in conversation or
-                not isinstance(conversation["chat_messages"], list) or
-                not conversation["chat_messages"]) or \
-                ("name" in conversation and
-                 isinstance(conversation["name"], str) and
-                 conversation["name"] == ""):
-
-            deleted_count += 1
-            continue  # Skip to the next conversation
-
-        if "name" not in conversation or not isinstance(conversation["name"], str):
-            print(
-                "Warning: Conversation missing 'name' or 'name' is not a string. Using a generic filename.")
-            base_filename = f"conversation_{data.index(conversation) + 1}"
-            conversation_name = base_filename
-        else:
-            conversation_name = conversation["name"]
-            # Sanitize the conversation name to create a valid filename
-            base_filename = "".join(c for c in conversation_name if c.isalnum() or c in "._- ")
-            base_filename = base_filename.strip()  # Remove leading/trailing whitespace
-            if not base_filename:  # if filename is empty after sanitization
-                base_filename = f"conversation_{data.index(conversation) + 1}"  # Use generic name
-
-        filename = f"{base_filename}.html"
-        output_path = os.path.join(output_dir, filename)
-
-        # Get initial prompt AFTER sorting
-        description = ""
+    ndjson_out = None
+    if ndjson_file:
         try:
-            # Load json to sort
-            json_string = json.dumps(conversation)  # dump and reload to keep from editing source material
-            sorted_conversation = json.loads(json_string)
-
-            # Sort it
-            sorted_conversation["chat_messages"].sort(
-                key=lambda x: datetime.datetime.fromisoformat(x["created_at"].replace('Z', '+00:00')))
-            if "chat_messages" in sorted_conversation and sorted_conversation["chat_messages"]:
-                # Access the timestamp of the first message and add to the list
-                first_message = sorted_conversation["chat_messages"][0]
-                if first_message["sender"].lower() == "human" and first_message["content"]:
-                    description = first_message["content"][0].get("text", "")  # extract first message
-                else:
-                    description = "No initial human message found."
-            else:
-                description = "No chat messages in conversation."
-        except Exception as prompt_error:
-            print("Could not read prompt", prompt_error)  # Don't interrupt code for message failure
-            description = "Error extracting description."
+            ndjson_out = open(ndjson_file, "w", encoding="utf-8")
+        except OSError as e:
+            print(f"Error: Could not open '{ndjson_file}' for writing: {e}")
+            return
 
+    render_cache = None
+    if cache_file:
         try:
-            # Add a timestamp to conversation list
-            if "chat_messages" in conversation and conversation["chat_messages"]:
-                # Access the timestamp of the first message and add to the list
-                first_message_time = conversation["chat_messages"][0].get("created_at")
-
-                # Handle different timestamp formats and possible missing time
-                if first_message_time:
-                    try:
-                        # First timestamp attempt
-                        datetime_object = datetime.datetime.fromisoformat(
-                            first_message_time.replace('Z', '+00:00'))
-                    except:
-                        print("Could not decode time object")
-                        datetime_object = None  # default to none for timestamp to allow the system to still run
-                else:
-                    datetime_object = None
-            else:
-                print("Warning: no messages found")
-                datetime_object = None
-        except Exception as time_error:
-            print("Error getting a time value", time_error)
-            datetime_object = None  # default to none for timestamp to allow the system to still run
+            render_cache = RenderCache(cache_file, cache_size)
+        except sqlite3.Error as e:
+            print(f"Warning: Could not open render cache '{cache_file}', rendering without it: {e}")
 
-        try:
-            # Sort messages *within* the conversation
+    precompressor = Precompressor(compress_min_size) if precompress else None
 
-            html_output = generate_html(json.dumps(conversation))
-            with open(output_path, "w", encoding="utf-8") as outfile:
-                outfile.write(html_output)
-            conversations.append((datetime_object, conversation_name, filename, description))  # add description
+    conversations = []  # stores each conversation as a tuple
+    deleted_count = 0
+
+    try:
+        for conversation in data:
+            if not isinstance(conversation, dict):
+                print("Warning: Found a non-dictionary element in the conversation list. Skipping.")
+                continue
 
-        except Exception as e:
-            print(f"Error writing to '{output_path}': {e}")
+            # Check for content. Conversations without chat_messages are considered deleted
+            if ("chat_messages" not in conversation or
+                    not isinstance(conversation["chat_messages"], list) or
+                    not conversation["chat_messages"]) or \
+                    ("name" in conversation and
+                     isinstance(conversation["name"], str) and
+                     conversation["name"] == ""):
+
+                deleted_count += 1
+                continue  # Skip to the next conversation
+
+            if "name" not in conversation or not isinstance(conversation["name"], str):
+                print(
+                    "Warning: Conversation missing 'name' or 'name' is not a string. Using a generic filename.")
+                base_filename = f"conversation_{data.index(conversation) + 1}"
+                conversation_name = base_filename
+            else:
+                conversation_name = conversation["name"]
+                # Sanitize the conversation name to create a valid filename
+                base_filename = "".join(c for c in conversation_name if c.isalnum() or c in "._- ")
+                base_filename = base_filename.strip()  # Remove leading/trailing whitespace
+                if not base_filename:  # if filename is empty after sanitization
+                    base_filename = f"conversation_{data.index(conversation) + 1}"  # Use generic name
+
+            filename = f"{base_filename}.html"
+            output_path = os.path.join(output_dir, filename)
+
+            if ndjson_out:
+                try:
+                    write_ndjson(conversation_records(conversation), ndjson_out)
+                except Exception as e:
+                    print(f"Error writing records for '{conversation_name}': {e}")
+
+            # Get initial prompt AFTER sorting
+            description = ""
+            try:
+                # Load json to sort
+                json_string = json.dumps(conversation)  # dump and reload to keep from editing source material
+                sorted_conversation = json.loads(json_string)
+
+                # Sort it
+                sorted_conversation["chat_messages"].sort(
+                    key=lambda x: datetime.datetime.fromisoformat(x["created_at"].replace('Z', '+00:00')))
+                if "chat_messages" in sorted_conversation and sorted_conversation["chat_messages"]:
+                    # Access the timestamp of the first message and add to the list
+                    first_message = sorted_conversation["chat_messages"][0]
+                    if first_message["sender"].lower() == "human" and first_message["content"]:
+                        description = first_message["content"][0].get("text", "")  # extract first message
+                    else:
+                        description = "No initial human message found."
+                else:
+                    description = "No chat messages in conversation."
+            except Exception as prompt_error:
+                print("Could not read prompt", prompt_error)  # Don't interrupt code for message failure
+                description = "Error extracting description."
+
+            try:
+                # Add a timestamp to conversation list
+                if "chat_messages" in conversation and conversation["chat_messages"]:
+                    # Access the timestamp of the first message and add to the list
+                    first_message_time = conversation["chat_messages"][0].get("created_at")
+
+                    # Handle different timestamp formats and possible missing time
+                    if first_message_time:
+                        try:
+                            # First timestamp attempt
+                            datetime_object = datetime.datetime.fromisoformat(
+                                first_message_time.replace('Z', '+00:00'))
+                        except:
+                            print("Could not decode time object")
+                            datetime_object = None  # default to none for timestamp to allow the system to still run
+                    else:
+                        datetime_object = None
+                else:
+                    print("Warning: no messages found")
+                    datetime_object = None
+            except Exception as time_error:
+                print("Error getting a time value", time_error)
+                datetime_object = None  # default to none for timestamp to allow the system to still run
+
+            try:
+                # Sort messages *within* the conversation
+
+                html_files = generate_html_pages(json.dumps(conversation), base_filename,
+                                                 max_message_size=max_message_size,
+                                                 max_artifact_size=max_artifact_size,
+                                                 max_page_messages=max_page_messages,
+                                                 max_page_size=max_page_size,
+                                                 render_cache=render_cache)
+                for html_filename, html_output in html_files:
+                    output_path = os.path.join(output_dir, html_filename)
+                    with open(output_path, "w", encoding="utf-8") as outfile:
+                        outfile.write(html_output)
+                    if precompressor:
+                        precompressor.submit(output_path, html_output)
+                conversations.append((datetime_object, conversation_name, filename, description))  # add description
+
+            except Exception as e:
+                print(f"Error writing to '{output_path}': {e}")
+
+            if render_cache:
+                # Keep what has been rendered so far if the run is interrupted
+                render_cache.commit()
+    finally:
+        # Close the files even when interrupted, so the work done so far is kept
+        if ndjson_out:
+            ndjson_out.close()
+        if render_cache:
+            render_cache.close()
+
+    if ndjson_out:
+        print(f"Successfully wrote records to '{ndjson_file}'")
+
+    if render_cache:
+        print(f"Render cache: {render_cache.hits} hits, {render_cache.misses} misses")
 
     # Sort the convos
     conversations.sort(key=lambda x: (x[0] is None, x[0]))  # sorts null dates to the end
@@ -756,10 +1359,15 @@ def process_claude_export(input_file, output_dir):
     try:
         with open(toc_path, "w", encoding="utf-8") as toc_file:
             toc_file.write(toc_html)
+        if precompressor:
+            precompressor.submit(toc_path, toc_html)
         print(f"Successfully wrote table of contents to '{toc_path}'")
     except Exception as e:
         print(f"Error writing table of contents: {e}")
 
+    if precompressor:
+        precompressor.close()
+
     print(f"\nCreated {toc_entries.__len__()} entries in TOC.")
     print(f"\nFound and skipped {deleted_count} deleted (empty) conversations.")  # Print total count
 
@@ -810,9 +1418,35 @@ def generate_toc(toc_entries, creation_timestamps, descriptions):
 
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python script.py <input_file.json> <output_directory>")
-    else:
-        input_file = sys.argv[1]
-        output_dir = sys.argv[2]
-        process_claude_export(input_file, output_dir)
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser(
+        description="Converts a Claude export (conversations.json) to formatted HTML files.")
+    arg_parser.add_argument("input_file", help="the conversations.json file from the Claude export")
+    arg_parser.add_argument("output_dir", help="directory to write the HTML files and index.html to")
+    arg_parser.add_argument("--ndjson", metavar="FILE",
+                            help="also write one JSON record per conversation and message to FILE")
+    arg_parser.add_argument("--max-message-size", metavar="BYTES", type=int,
+                            help="truncate message text longer than this and link to the full text")
+    arg_parser.add_argument("--max-artifact-size", metavar="BYTES", type=int,
+                            help="move artifacts larger than this to their own page")
+    arg_parser.add_argument("--page-messages", metavar="N", type=int,
+                            help="split conversations into pages of at most N messages")
+    arg_parser.add_argument("--page-size", metavar="BYTES", type=int,
+                            help="split conversations into pages of roughly this many bytes")
+    arg_parser.add_argument("--cache", metavar="FILE",
+                            help="reuse rendered messages from earlier runs, cached in the SQLite file FILE")
+    arg_parser.add_argument("--cache-size", metavar="MB", type=int, default=256,
+                            help="maximum size of the render cache (default: 256)")
+    arg_parser.add_argument("--precompress", action="store_true",
+                            help="also write .gz (and .br, if brotli is installed) copies of the HTML files")
+    arg_parser.add_argument("--compress-min-size", metavar="BYTES", type=int, default=1024,
+                            help="don't pre-compress files smaller than this (default: 1024)")
+    args = arg_parser.parse_args()
+    process_claude_export(args.input_file, args.output_dir, ndjson_file=args.ndjson,
+                          max_message_size=args.max_message_size,
+                          max_artifact_size=args.max_artifact_size,
+                          max_page_messages=args.page_messages,
+                          max_page_size=args.page_size,
+                          cache_file=args.cache,
+                          cache_size=args.cache_size * 1024 * 1024,
+                          precompress=args.precompress,
+                          compress_min_size=args.compress_min_size)
\ No newline at end of file
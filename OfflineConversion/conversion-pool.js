@@ -0,0 +1,395 @@
+// Parallel conversion of a Claude export with a pool of Web Workers
+//
+// Produces the same files as process_claude_export() in claude_export_formatter.py:
+// one <conversation name>.html per conversation and an index.html table of contents.
+// Must be loaded after html-converter.js, whose functions are copied into the workers.
+
+// Functions from html-converter.js that generateHtml needs inside a worker
+const converterFunctions = [
+  parser,
+  escapeHtml,
+  processInlineCodeInText,
+  processNestedList,
+  processNestedNumberedList,
+  replaceArtifactTags,
+  replaceInlineCode,
+  generateHtml
+];
+
+// Same characters as the filename sanitising in process_claude_export()
+function sanitizeFilename(name)
+{
+  return name.replace(/[^\p{L}\p{N}._\- ]/gu, '').trim();
+}
+
+// Python's html.escape(), so the index matches generate_toc() exactly
+function escapeTocText(str)
+{
+  return str.replace(/&/g, "&amp;")
+    .replace(/</g, "&lt;")
+    .replace(/>/g, "&gt;")
+    .replace(/"/g, "&quot;")
+    .replace(/'/g, "&#x27;");
+}
+
+// Parses an ISO 8601 timestamp (extended or basic form) the way Python's datetime.fromisoformat()
+// does for export timestamps; week and ordinal dates are not handled. Returns {time, text} for
+// the table of contents, keeping the timestamp's own UTC offset in text, or null if it is invalid.
+function parseTocTimestamp(value)
+{
+  const match = typeof value === 'string' &&
+    value.match(/^(\d{4})-?(\d{2})-?(\d{2})(?:[T ](\d{2})(?::?(\d{2})(?::?(\d{2})(?:[.,](\d+))?)?)?(Z|([+-])(\d{2})(?::?(\d{2})(?::?(\d{2}))?)?)?)?$/);
+  if (!match)
+  {
+    return null;
+  }
+  const [year, month, day, hour, minute, second] = match.slice(1, 7).map(part => Number(part || 0));
+  const milliseconds = Number((match[7] || '').padEnd(3, '0').slice(0, 3));
+  const date = new Date(Date.UTC(year, month - 1, day));
+  if (date.getUTCMonth() !== month - 1 || date.getUTCDate() !== day || hour > 23 || minute > 59 || second > 59)
+  {
+    return null;
+  }
+
+  let time = Date.UTC(year, month - 1, day, hour, minute, second, milliseconds);
+  if (match[9])
+  {
+    const offset = Number(match[10]) * 3600 + Number(match[11] || 0) * 60 + Number(match[12] || 0);
+    time -= (match[9] === '-' ? -1 : 1) * offset * 1000;
+  }
+  const pad = (number) => String(number).padStart(2, '0');
+  return { time: time, text: `${match[1]}-${match[2]}-${match[3]} ${pad(hour)}:${pad(minute)}` };
+}
+
+// Throws for conversations that render_message() in claude_export_formatter.py fails on,
+// so that the pool leaves out the same conversations as the Python version
+function checkConversation(conversation)
+{
+  if (typeof conversation.name !== 'string')
+  {
+    throw new Error('Conversation has no name');
+  }
+  conversation.chat_messages.forEach((message, index) =>
+  {
+    if (!message || typeof message !== 'object' || typeof message.sender !== 'string')
+    {
+      throw new Error(`Message ${index + 1} has no sender`);
+    }
+    if (!parseTocTimestamp(message.created_at))
+    {
+      throw new Error(`Message ${index + 1} has no valid created_at`);
+    }
+    if (!Array.isArray(message.content) || message.content.some(content => !content || typeof content !== 'object' ||
+        (content.type === 'tool_use' && content.name === 'repl' ?
+          !('id' in content) || !content.input || typeof content.input.code !== 'string' :
+          Boolean(content.text) && typeof content.text !== 'string')))
+    {
+      throw new Error(`Message ${index + 1} has invalid content`);
+    }
+  });
+}
+
+// Converts one conversation (as a JSON string) the way process_claude_export() does
+function convertConversation(json, index)
+{
+  const conversation = parser(json);
+  if (!conversation || typeof conversation !== 'object' || Array.isArray(conversation))
+  {
+    return { index: index, skipped: true };
+  }
+
+  // Conversations without chat_messages or with an empty name are considered deleted
+  if (!Array.isArray(conversation.chat_messages) || conversation.chat_messages.length === 0 ||
+      conversation.name === '')
+  {
+    return { index: index, deleted: true };
+  }
+
+  checkConversation(conversation);
+
+  let name = conversation.name;
+  let baseFilename = typeof name === 'string' ? sanitizeFilename(name) : '';
+  if (typeof name !== 'string')
+  {
+    baseFilename = `conversation_${index + 1}`;
+    name = baseFilename;
+  }
+  else if (!baseFilename)
+  {
+    baseFilename = `conversation_${index + 1}`;
+  }
+
+  // The TOC uses the timestamp of the first message as stored in the export
+  const timestamp = parseTocTimestamp(conversation.chat_messages[0].created_at);
+
+  const sorted = { ...conversation };
+  sorted.chat_messages = [...conversation.chat_messages].sort((a, b) => new Date(a.created_at) - new Date(b.created_at));
+
+  let description;
+  try
+  {
+    const firstMessage = sorted.chat_messages[0];
+    if (firstMessage.sender.toLowerCase() === 'human' && firstMessage.content && firstMessage.content.length)
+    {
+      description = firstMessage.content[0].text || '';
+    }
+    else
+    {
+      description = 'No initial human message found.';
+    }
+  }
+  catch
+  {
+    description = 'Error extracting description.';
+  }
+
+  return {
+    index: index,
+    entry: {
+      index: index,
+      name: name,
+      filename: `${baseFilename}.html`,
+      time: timestamp ? timestamp.time : null,
+      timestampText: timestamp ? timestamp.text : null,
+      description: description
+    },
+    html: generateHtml(JSON.stringify(sorted))
+  };
+}
+
+// Message handling inside a worker: either splits the export or converts single conversations
+function conversionWorkerMain()
+{
+  const port = typeof self !== 'undefined' ? self : require('worker_threads').parentPort;
+
+  port.addEventListener('message', async (event) =>
+  {
+    const message = event.data;
+    if (message.type === 'split')
+    {
+      let data;
+      try
+      {
+        // The export is read here rather than on the page, so the page never holds it as one string
+        const text = typeof message.file === 'string' ? message.file : await message.file.text();
+        data = JSON.parse(text);
+      }
+      catch (error)
+      {
+        port.postMessage({ type: 'error', message: 'Error parsing JSON: ' + error });
+        return;
+      }
+      if (!Array.isArray(data))
+      {
+        port.postMessage({ type: 'error', message: 'Error:  JSON data must be an array of conversations.' });
+        return;
+      }
+      port.postMessage({ type: 'count', total: data.length });
+      data.forEach((conversation, index) =>
+      {
+        port.postMessage({ type: 'conversation', index: index, json: JSON.stringify(conversation) });
+      });
+      port.postMessage({ type: 'split-done' });
+    }
+    else if (message.type === 'convert')
+    {
+      try
+      {
+        port.postMessage({ type: 'converted', ...convertConversation(message.json, message.index) });
+      }
+      catch (error)
+      {
+        port.postMessage({ type: 'converted', index: message.index, failed: String(error) });
+      }
+    }
+  });
+}
+
+function buildWorkerSource()
+{
+  const functions = [...converterFunctions, sanitizeFilename, parseTocTimestamp, checkConversation,
+                     convertConversation, conversionWorkerMain];
+  return [
+    `const typeLookup = ${JSON.stringify(typeLookup)};`,
+    'let artifactCounter = 0;',
+    ...functions.map(f => f.toString()),
+    'conversionWorkerMain();'
+  ].join('\n\n');
+}
+
+// Same page as generate_toc() in claude_export_formatter.py
+function generateToc(entries)
+{
+  let html = `
+    <!DOCTYPE html>
+    <html>
+    <head>
+        <title>Claude Conversations</title>
+        <style>
+            body { font-family: sans-serif;
+                     width: 1000px;
+                     margin: auto;}
+            ul { list-style-type: none; padding: 0; }
+            li { margin-bottom: 1em; }  /* Increased for better spacing */
+            a { text-decoration: none; color: blue; }
+            a:hover { text-decoration: underline; }
+            .timestamp { color: black; font-size: 1em; white-space: nowrap;}
+            .description {
+                font-size: 0.8em;
+                color: black;
+                margin-left: 3em; /* Aligned with the start of the link */
+            }
+        </style>
+    </head>
+    <body>
+        <h1>Claude Conversations</h1>
+        <ul>
+    `;
+
+  entries.forEach(entry =>
+  {
+    if (entry.timestampText)
+    {
+      html += `
+            <li><span class="timestamp">[${entry.timestampText}]</span> <a href="${entry.filename}">${escapeTocText(entry.name)}</a><br><span class="description">${escapeTocText(entry.description)}</span></li>\n`;
+    }
+    else
+    {
+      html += `<li><span class="timestamp">[Timestamp Unavailable]</span> <a href="${entry.filename}">${escapeTocText(entry.name)}</a><br><span class="description">Description Unavailable</span></li>\n`;
+    }
+  });
+  html += `
+        </ul>
+    </body>
+    </html>
+    `;
+  return html;
+}
+
+// Converts a conversations.json export, given as a File (or other Blob) or as
+// its text, in a pool of workers. onFile(filename, html) is called as each
+// conversation is converted and onProgress(done, total) after each one.
+// Resolves to { entries, total, deletedCount, failedCount } with entries
+// sorted for the index.
+function convertExportInWorkers(file, options = {})
+{
+  const workerCount = Math.max(1, options.workerCount || (typeof navigator !== 'undefined' && navigator.hardwareConcurrency) || 4);
+  let sourceUrl = null;
+  // Workers are created from a Blob, as pages opened from file:// may not load worker scripts by URL
+  const createWorker = options.createWorker || ((source) =>
+  {
+    sourceUrl = sourceUrl || URL.createObjectURL(new Blob([source], { type: 'text/javascript' }));
+    return new Worker(sourceUrl);
+  });
+  const onFile = options.onFile || (() => {});
+  const onProgress = options.onProgress || (() => {});
+
+  return new Promise((resolve, reject) =>
+  {
+    const source = buildWorkerSource();
+    const splitter = createWorker(source);
+    const workers = [];
+    const idle = [];
+    const pending = [];
+    const entries = [];
+    const fileOwners = new Map();
+    let total = null;
+    let done = 0;
+    let deletedCount = 0;
+    let failedCount = 0;
+    let finished = false;
+
+    function finish(error)
+    {
+      if (finished) return;
+      finished = true;
+      splitter.terminate();
+      workers.forEach(worker => worker.terminate());
+      if (sourceUrl)
+      {
+        URL.revokeObjectURL(sourceUrl);
+      }
+      if (error)
+      {
+        reject(error);
+        return;
+      }
+      // Null timestamps sort last, ties keep the export order
+      entries.sort((a, b) => (a.time === null) - (b.time === null) || (a.time - b.time) || (a.index - b.index));
+      resolve({ entries: entries, total: total, deletedCount: deletedCount, failedCount: failedCount });
+    }
+
+    function dispatch()
+    {
+      while (idle.length && pending.length)
+      {
+        const worker = idle.pop();
+        const message = pending.shift();
+        worker.postMessage({ type: 'convert', index: message.index, json: message.json });
+      }
+      if (total !== null && done === total)
+      {
+        finish();
+      }
+    }
+
+    function handleResult(worker, result)
+    {
+      if (result.failed)
+      {
+        failedCount++;
+        console.error(`Error converting conversation ${result.index + 1}:`, result.failed);
+      }
+      else if (result.deleted)
+      {
+        deletedCount++;
+      }
+      else if (!result.skipped)
+      {
+        entries.push(result.entry);
+        // Like the Python version, a later conversation with the same filename replaces an earlier one
+        const owner = fileOwners.get(result.entry.filename);
+        if (owner === undefined || owner < result.index)
+        {
+          fileOwners.set(result.entry.filename, result.index);
+          onFile(result.entry.filename, result.html);
+        }
+      }
+      done++;
+      onProgress(done, total);
+      idle.push(worker);
+      dispatch();
+    }
+
+    for (let i = 0; i < workerCount; i++)
+    {
+      const worker = createWorker(source);
+      worker.addEventListener('message', (event) => handleResult(worker, event.data));
+      worker.addEventListener('error', (event) => finish(new Error(event.message || 'Worker error')));
+      workers.push(worker);
+      idle.push(worker);
+    }
+
+    splitter.addEventListener('message', (event) =>
+    {
+      const message = event.data;
+      if (message.type === 'error')
+      {
+        finish(new Error(message.message));
+      }
+      else if (message.type === 'count')
+      {
+        total = message.total;
+        onProgress(done, total);
+      }
+      else if (message.type === 'conversation')
+      {
+        pending.push(message);
+      }
+      dispatch();
+    });
+    splitter.addEventListener('error', (event) => finish(new Error(event.message || 'Worker error')));
+
+    splitter.postMessage({ type: 'split', file: file });
+  });
+}
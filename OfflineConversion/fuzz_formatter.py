@@ -0,0 +1,264 @@
+"""
+Fuzz and differential tests for claude_export_formatter.py.
+
+Two kinds of checks are run on randomly generated message text:
+
+* Scaling: an input is repeated at increasing sizes and rendered with
+  replace_artifact_tags() and replace_inline_code(). Inputs whose render time
+  grows super-linearly, or that exceed the per-input time budget, are reported.
+  Each input runs in a child process so a runaway regex can't hang the run.
+
+* Differential: the same text is converted by html-converter.js through a
+  local JavaScript runtime (node), and the parts both converters are meant to
+  render identically (HTML escaping, artifact tags and inline code spans) are
+  compared after normalising indentation.
+
+Usage: python fuzz_formatter.py [--iterations N] [--seed N] [--budget SECONDS]
+
+Exits with status 1 if any problem was found.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+import claude_export_formatter as formatter
+
+# Fragments that exercise the artifact, code and list regexes
+tokens = [
+    "<antArtifact", ' title="T"', " type='text/html'", ' language="python"', ">", "</antArtifact>",
+    "```", "```js\n", "`", "\n", "\n\n", " ", "   ", "\t", "1.", "12. ", "- ", "* ", "-", "*",
+    "a", "word ", "<", "&", '"', "'", "$&", "$'", "é", "\u00a0",
+]
+
+# Inputs that are always checked for scaling, in addition to the random ones
+known_inputs = [
+    "<antArtifact ",
+    '<antArtifact title="T">',
+    '<antArtifact title="T">x</antArtifact>',
+    "\n ",
+    "1. a\n",
+    "   1. a\n",
+    "- a\n",
+    "```js\ncode\n",
+    "`",
+]
+
+js_runner = r"""
+const fs = require('fs');
+const vm = require('vm');
+const context = vm.createContext({});
+vm.runInContext(fs.readFileSync(process.argv[1], 'utf8'), context);
+context.cases = JSON.parse(fs.readFileSync(0, 'utf8'));
+const results = vm.runInContext(`cases.map(([kind, text]) => {
+  if (kind === 'escape') {
+    return escapeHtml(text);
+  }
+  if (kind === 'inline') {
+    return processInlineCodeInText(text);
+  }
+  artifactCounter = 0;
+  const panels = [];
+  const html = replaceArtifactTags(text, panels);
+  return html + '\\n' + panels.join('\\n');
+})`, context);
+process.stdout.write(JSON.stringify(results));
+"""
+
+
+def random_text(rng, max_tokens):
+    """Returns a random string built from the regex-relevant tokens."""
+    return "".join(rng.choice(tokens) for _ in range(rng.randint(1, max_tokens)))
+
+
+def render(text):
+    """Runs the message text conversion that generate_html applies to each message."""
+    formatter.artifact_counter = 0
+    return formatter.replace_inline_code(formatter.replace_artifact_tags(text, []))
+
+
+def time_render(text, budget, repeats=3):
+    """Returns the best of several render times for text, in seconds, stopping early if one is over budget."""
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        render(text)
+        best = min(best, time.perf_counter() - start)
+        if best > budget:
+            break
+    return best
+
+
+def scaling_worker(unit, sizes, budget, results):
+    for size in sizes:
+        text = unit * max(1, size // len(unit))
+        results.put((len(text), time_render(text, budget)))
+
+
+def check_scaling(unit, sizes, budget, min_time, max_exponent):
+    """
+    Renders unit repeated up to each size and returns a problem description,
+    or None if the render time grows roughly linearly and stays within budget.
+    """
+    results = multiprocessing.Queue()
+    worker = multiprocessing.Process(target=scaling_worker, args=(unit, sizes, budget, results), daemon=True)
+    worker.start()
+
+    timings = []
+    while len(timings) < len(sizes):
+        try:
+            # Allow for the repeated timing runs and for starting the child process
+            timeout = budget * 3 + (5 if not timings else 0)
+            timings.append(results.get(timeout=timeout))
+        except queue.Empty:
+            worker.terminate()
+            size = sizes[len(timings)]
+            return f"exceeded the {budget}s budget at about {size} characters"
+    worker.join()
+
+    over_budget = [(length, seconds) for length, seconds in timings if seconds > budget]
+    if over_budget:
+        length, seconds = over_budget[0]
+        return f"took {seconds:.2f}s at {length} characters (budget {budget}s)"
+
+    (first_length, first_time), (last_length, last_time) = timings[0], timings[-1]
+    if last_time < min_time:
+        return None  # too fast to measure reliably
+    exponent = math.log(last_time / max(first_time, 1e-9)) / math.log(last_length / first_length)
+    if exponent > max_exponent:
+        steps = ", ".join(f"{length}: {seconds * 1000:.1f}ms" for length, seconds in timings)
+        return f"render time grows as about n^{exponent:.1f} ({steps})"
+    return None
+
+
+def find_js_runtime():
+    """Returns the path of a node executable, or None."""
+    return os.environ.get("NODE") or shutil.which("node") or shutil.which("nodejs")
+
+
+def run_js(runtime, converter, cases):
+    """Converts (kind, text) cases with html-converter.js and returns the results."""
+    completed = subprocess.run([runtime, "-e", js_runner, converter], input=json.dumps(cases),
+                               capture_output=True, text=True, encoding="utf-8", timeout=600)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip())
+    return json.loads(completed.stdout)
+
+
+def run_python(kind, text):
+    """Python counterpart of the cases in js_runner."""
+    if kind == "escape":
+        return formatter.escape_html(text)
+    if kind == "inline":
+        return formatter.replace_inline_code(text)
+    formatter.artifact_counter = 0
+    panels = []
+    html = formatter.replace_artifact_tags(text, panels)
+    return html + "\n" + "\n".join(panels)
+
+
+def normalise(output):
+    """Drops template indentation and blank lines, and unifies the two spellings of an escaped quote."""
+    output = output.replace("&#x27;", "&#39;")
+    return "\n".join(line.strip() for line in output.splitlines() if line.strip())
+
+
+def differs(python_output, js_output):
+    return normalise(python_output) != normalise(js_output)
+
+
+def shrink(runtime, converter, kind, parts):
+    """Removes tokens from a failing case for as long as it keeps failing."""
+    while len(parts) > 1:
+        candidates = [parts[:i] + parts[i + 1:] for i in range(len(parts))]
+        js_outputs = run_js(runtime, converter, [(kind, "".join(c)) for c in candidates])
+        for candidate, js_output in zip(candidates, js_outputs):
+            if differs(run_python(kind, "".join(candidate)), js_output):
+                parts = candidate
+                break
+        else:
+            break
+    return "".join(parts)
+
+
+def differential_cases(rng, iterations):
+    """Returns random (kind, token list) cases for the differential tests."""
+    cases = []
+    for _ in range(iterations):
+        parts = [rng.choice(tokens) for _ in range(rng.randint(1, 40))]
+        cases.append(("escape", parts))
+        cases.append(("artifact", parts))
+        # replace_inline_code only matches processInlineCodeInText on single lines without list markers
+        inline = [p for p in parts if "\n" not in p and p not in ("1.", "12. ", "- ", "* ", "-", "*")]
+        cases.append(("inline", ["a"] + inline))
+    return cases
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Fuzzes the Claude export formatter.")
+    arg_parser.add_argument("--iterations", type=int, default=200, help="random inputs per check (default: 200)")
+    arg_parser.add_argument("--seed", type=int, default=None, help="random seed, to reproduce a run")
+    arg_parser.add_argument("--budget", type=float, default=2.0,
+                            help="maximum seconds to render one input (default: 2)")
+    arg_parser.add_argument("--max-size", type=int, default=64 * 1024,
+                            help="largest input size in characters for the scaling check (default: 65536)")
+    arg_parser.add_argument("--js", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "html-converter.js"),
+                            help="JavaScript converter to compare against (default: html-converter.js)")
+    arg_parser.add_argument("--no-js", action="store_true", help="skip the differential tests")
+    args = arg_parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    print(f"Seed: {seed}")
+    problems = 0
+
+    # Scaling: known troublemakers first, then short random units
+    sizes = [args.max_size >> shift for shift in range(4, -1, -1)]
+    units = known_inputs + [random_text(rng, 4) for _ in range(args.iterations)]
+    for unit in dict.fromkeys(units):
+        problem = check_scaling(unit, sizes, args.budget, min_time=0.02, max_exponent=1.5)
+        if problem:
+            problems += 1
+            print(f"SLOW: {unit!r} repeated: {problem}")
+    print(f"Scaling: checked {len(set(units))} inputs")
+
+    # Differential against the JavaScript converter
+    runtime = find_js_runtime()
+    if args.no_js:
+        pass
+    elif not runtime:
+        print("Differential: skipped, no JavaScript runtime (node) found")
+    else:
+        cases = differential_cases(rng, args.iterations)
+        js_outputs = run_js(runtime, args.js, [(kind, "".join(parts)) for kind, parts in cases])
+        failures = [(kind, parts) for (kind, parts), js_output in zip(cases, js_outputs)
+                    if differs(run_python(kind, "".join(parts)), js_output)]
+        reported = set()
+        for kind, parts in failures:
+            text = shrink(runtime, args.js, kind, parts)
+            if (kind, text) in reported:
+                continue
+            reported.add((kind, text))
+            problems += 1
+            python_lines = normalise(run_python(kind, text)).splitlines()
+            js_lines = normalise(run_js(runtime, args.js, [(kind, text)])[0]).splitlines()
+            line = next((i for i, pair in enumerate(zip(python_lines, js_lines)) if pair[0] != pair[1]),
+                        min(len(python_lines), len(js_lines)))
+            print(f"DIFF ({kind}): {text!r}")
+            print(f"  python line {line + 1}: {(python_lines[line:line + 1] or [''])[0][:200]!r}")
+            print(f"  js line {line + 1}:     {(js_lines[line:line + 1] or [''])[0][:200]!r}")
+        print(f"Differential: compared {len(cases)} cases with {args.js}")
+
+    print(f"{problems} problem(s) found")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())